@@ -23,6 +23,25 @@ from .features import classes as feature_classes
 from .commons import create_key
 from .config import ConfigurationRegistry
 from .space import Space
+from memoization import cached
+
+@cached
+def _get_extractor(cls):
+    """
+    Feature extractors query remote resources and parse all their features
+    when constructed, so we keep one instance per extractor class. Only
+    extractors without arguments are kept, since their number is fixed.
+    """
+    return cls()
+
+@cached
+def _inverse_affine(affine_bytes,dtype):
+    """
+    Inverse of a 4x4 affine matrix, given by its raw bytes so that it can be
+    used as a cache key. Repeated coordinate queries in the same space then
+    reuse the inversion.
+    """
+    return npl.inv(np.frombuffer(affine_bytes,dtype=dtype).reshape(4,4))
 
 class Atlas:
 
@@ -58,8 +77,8 @@ class Atlas:
         Provides an object hook for the json library to construct an Atlas
         object from a json stream.
         """
-        if all([ '@id' in obj, 'spaces' in obj, 'parcellations' in obj,
-            obj['@id'].startswith("juelich/iav/atlas/v1.0.0") ]):
+        if ( '@id' in obj and 'spaces' in obj and 'parcellations' in obj
+                and obj['@id'].startswith("juelich/iav/atlas/v1.0.0") ):
             p = Atlas(obj['@id'], obj['name'])
             for space_id in obj['spaces']:
                 assert(space_id in spaces)
@@ -281,15 +300,37 @@ class Atlas:
 
         NOTE: since get_mask is lru-cached, this is not necessary slow
         """
+        return self.coordinates_selected(space,[coordinate])[0]
+
+    def coordinates_selected(self,space,coordinates):
+        """
+        Verifies for several positions in the given space wether they are part
+        of the current selection. The selection mask is read once for all
+        positions.
+
+        Parameters
+        ----------
+        space : Space
+            The template space in which the test shall be carried out
+        coordinates : list of tuple x/y/z, or Nx3 array
+            Coordinate positions given in the physical space.
+
+        Return
+        ------
+        Boolean array with one entry per coordinate
+        """
         assert(space in self.spaces)
         # transform physical coordinates to voxel coordinates for the query
         mask = self.build_mask(space)
-        voxel = (apply_affine(npl.inv(mask.affine),coordinate)+.5).astype(int)
-        if np.any(voxel>=mask.dataobj.shape):
-            return False
-        if mask.dataobj[voxel[0],voxel[1],voxel[2]]==0:
-            return False
-        return True
+        phys2vox = _inverse_affine(mask.affine.tobytes(),mask.affine.dtype.str)
+        voxels = (apply_affine(phys2vox,np.asarray(coordinates,dtype=float).reshape(-1,3))+.5).astype(int)
+        # single fused bounds check; negative indices would otherwise wrap
+        # around silently.
+        inside = ~np.any((voxels<0)|(voxels>=mask.shape[:3]),axis=1)
+        selected = np.zeros(len(voxels),dtype=bool)
+        X,Y,Z = voxels[inside].T
+        selected[inside] = np.asanyarray(mask.dataobj)[X,Y,Z]!=0
+        return selected
 
     def get_features(self,modality,**kwargs):
         """
@@ -312,9 +353,10 @@ class Atlas:
 
         for cls in features.extractor_types[modality]:
             if modality=='GeneExpression':
+                # one query per gene, which is not kept after the call
                 extractor = cls(kwargs['gene'])
             else:
-                extractor = cls()
+                extractor = _get_extractor(cls)
             hits.extend(extractor.pick_selection(self))
 
         return hits
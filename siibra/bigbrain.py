@@ -16,22 +16,56 @@
 from . import logger
 from . import retrieval 
 import os
-import requests
 import json
+import time
 import numpy as np
 from cloudvolume import CloudVolume,Bbox
 from memoization import cached
 import nibabel as nib
 
+# File suffixes which identify a url as a plain file download rather than a
+# neuroglancer precomputed store, so that it need not be probed.
+_FILE_SUFFIXES = ('.nii','.nii.gz','.zip','.json')
+
+# http status codes of a store probe which are remembered on disk, and the
+# time in seconds after which a remembered negative answer is probed again
+_DEFINITE_STATUS_CODES = (200,404,410)
+_NEGATIVE_CACHE_SECONDS = 3600
+
 @cached
 def is_ngprecomputed(url):
-    # Check if the given URL is likely a neuroglancer precomputed cloud store
+    # Check if the given URL is likely a neuroglancer precomputed cloud store.
+    # Definite answers are remembered on disk, so that urls which are not
+    # neuroglancer stores are not probed again in every session.
+    if url.lower().endswith(_FILE_SUFFIXES):
+        return False
+    cachefile = retrieval.cachefile((url+"/info").encode('utf8'),suffix='isng')
+    if os.path.isfile(cachefile):
+        with open(cachefile,'r') as f:
+            known = f.read()=='1'
+        # negative answers expire, since a store may be published later
+        if known or time.time()-os.path.getmtime(cachefile)<_NEGATIVE_CACHE_SECONDS:
+            return known
     try: 
-        r = requests.get(url+"/info")
-        info = json.loads(r.content)
-        return info['type'] in ['image','segmentation']
+        r = retrieval.SESSION.get(url+"/info")
     except Exception as _:
+        # connection problem, do not remember the result
         return False
+    try:
+        info = json.loads(r.content)
+        result = info['type'] in ['image','segmentation']
+    except Exception as _:
+        result = False
+    # Only definite answers are remembered. Others, like authorization
+    # failures or rate limiting, may change with the next request.
+    if r.status_code in _DEFINITE_STATUS_CODES:
+        # written to a temporary file first, so that the cache never holds
+        # a partially written answer
+        tmpfile = cachefile+".tmp"
+        with open(tmpfile,'w') as f:
+            f.write('1' if result else '0')
+        os.replace(tmpfile,cachefile)
+    return result
 
 
 @cached
@@ -76,10 +110,10 @@ class BigBrainVolume:
         """
         ngsite: base url of neuroglancer http location
         """
-        with requests.get(ngsite+'/transform.json') as r:
-            self._translation_nm = np.array(json.loads(r.content))[:,-1]
-        with requests.get(ngsite+'/info') as r:
-            self.info = json.loads(r.content)
+        # the volume metadata is kept in the disk cache across sessions
+        self._translation_nm = np.array(json.loads(
+            retrieval.cached_get(ngsite+'/transform.json')))[:,-1]
+        self.info = json.loads(retrieval.cached_get(ngsite+'/info'))
         self.volume = CloudVolume(ngsite,fill_missing=fill_missing,progress=False)
         self.ngsite = ngsite
         self.nbits = np.iinfo(self.volume.info['data_type']).bits
@@ -182,11 +216,16 @@ class BigBrainVolume:
         cachefile = retrieval.cachefile("{}{}{}".format(
             self.ngsite, bbox.serialize(), str(mip)).encode('utf8'),suffix='npy')
         if os.path.exists(cachefile):
-            return np.load(cachefile)
+            # memory-map cached data, so that only the parts actually accessed
+            # are read from disk. Copy-on-write keeps the cache file intact
+            # if the caller modifies the array.
+            return np.load(cachefile,mmap_mode='c')
         else:
-            data = self.volume.download(bbox=bbox,mip=mip)
-            np.save(cachefile,np.array(data))
-            return np.array(data)
+            # convert the downloaded cutout to a plain array only once, and
+            # use that both for the cache file and the result.
+            data = np.asarray(self.volume.download(bbox=bbox,mip=mip))
+            np.save(cachefile,data)
+            return data
 
     def determine_mip(self,resolution=None):
         # given a resolution in micrometer, try to determine the mip that can
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import re
+from memoization import cached
 
 class Glossary:
     """
@@ -21,6 +22,8 @@ class Glossary:
     """
     def __init__(self,words):
         self.words = list(words)
+        # set view for constant-time lookups, the list keeps the order
+        self._wordset = frozenset(self.words)
 
     def __dir__(self):
         return self.words
@@ -32,21 +35,25 @@ class Glossary:
         return (w for w in self.words)
 
     def __contains__(self,index):
-        return index in self.__dir__()
+        return index in self._wordset
 
     def __getattr__(self,name):
-        if name in self.words:
+        if name in self._wordset:
             return name
         else:
             raise AttributeError("No such term: {}".format(name))
 
+# precompiled, since keys are created for every region and object name
+_SPACES = re.compile(r' +')
+
+@cached
 def create_key(name):
     """
     Creates an uppercase identifier string that includes only alphanumeric
     characters and underscore from a natural language name.
     """
-    return re.sub(
-            r' +','_',
+    return _SPACES.sub(
+            '_',
             "".join([e if e.isalnum() else " " 
                 for e in name]).upper().strip() 
             )
@@ -13,10 +13,14 @@
 # limitations under the License.
 
 import json
-from . import logger,__version__
+from . import logger,__version__,retrieval
 from .commons import create_key
 from gitlab import Gitlab
+from memoization import cached
 import os
+import tarfile
+import zlib
+from io import BytesIO
 
 # Until openminds is fully supported, 
 # we store atlas configurations in a gitlab repo.
@@ -28,6 +32,70 @@ GITLAB_PROJECT_TAG=os.getenv("SIIBRA_CONFIG_GITLAB_PROJECT_TAG", "siibra-{}".for
 if "SIIBRA_CONFIG_GITLAB_PROJECT_TAG" in os.environ:
     logger.warning(f"environ SIIBRA_CONFIG_GITLAB_PROJECT_TAG set, using {GITLAB_PROJECT_TAG} as GITLAB_PROJECT_TAG")
 
+@cached
+def _get_project():
+    """
+    Connect to the gitlab project holding the atlas configurations. All
+    registries share this connection.
+    """
+    return Gitlab(GITLAB_SERVER).projects.get(GITLAB_PROJECT_ID)
+
+@cached
+def _get_config_files():
+    """
+    Download the configuration repository at the selected tag as a single
+    archive, shared by all registries, and extract its json files.
+
+    Return
+    ------
+    dict mapping file paths relative to the repository root to file contents
+    """
+    # Release tags are fixed, so their archive is kept in the disk cache across
+    # sessions. A custom tag set via the environment may point to a moving
+    # branch, and is always downloaded.
+    persist = "SIIBRA_CONFIG_GITLAB_PROJECT_TAG" not in os.environ
+    cachefile = retrieval.cachefile("{}/{}/{}".format(
+        GITLAB_SERVER,GITLAB_PROJECT_ID,GITLAB_PROJECT_TAG).encode('utf8'),
+        suffix='tar.gz')
+    if persist and os.path.isfile(cachefile):
+        with open(cachefile,'rb') as f:
+            archive = f.read()
+        try:
+            return _extract_config_files(archive)
+        except (tarfile.TarError,EOFError,OSError,zlib.error) as e:
+            # a broken cache file would otherwise fail every import of siibra
+            logger.warning("Cached configuration archive is broken ({}), downloading it again.".format(e))
+            os.remove(cachefile)
+
+    archive = _get_project().repository_archive(sha=GITLAB_PROJECT_TAG)
+    files = _extract_config_files(archive)
+    if persist:
+        # write to a temporary file first, so that an interrupted write
+        # never leaves a truncated archive in the cache
+        tmpfile = cachefile+".tmp"
+        with open(tmpfile,'wb') as f:
+            f.write(archive)
+        os.replace(tmpfile,cachefile)
+    return files
+
+def _extract_config_files(archive):
+    """
+    Extract the json files of a gzipped configuration repository archive.
+
+    Return
+    ------
+    dict mapping file paths relative to the repository root to file contents
+    """
+    files = {}
+    with tarfile.open(fileobj=BytesIO(archive),mode='r:gz') as tar:
+        for member in tar.getmembers():
+            if not (member.isfile() and member.name.endswith('.json')):
+                continue
+            # strip the top-level folder that gitlab adds to the archive
+            path = member.name.split('/',1)[-1]
+            files[path] = tar.extractfile(member).read().decode('utf-8')
+    return files
+
 class ConfigurationRegistry:
     """
     Registers atlas configurations from json files managed in EBRAINS, by
@@ -50,11 +118,9 @@ class ConfigurationRegistry:
         logger.debug("Initializing registry of type {} for {}".format(
             cls,config_subfolder))
 
-        # open gitlab repository with atlas configurations
-        project = Gitlab(GITLAB_SERVER).projects.get(GITLAB_PROJECT_ID)
-        subfolders = [node['name'] 
-                for node in project.repository_tree(ref=GITLAB_PROJECT_TAG) 
-                if node['type']=='tree']
+        # get the atlas configurations from the gitlab repository
+        files = _get_config_files()
+        subfolders = {path.split('/')[0] for path in files if '/' in path}
 
         # parse the selected subfolder
         assert(config_subfolder in subfolders)
@@ -63,14 +129,11 @@ class ConfigurationRegistry:
         self.by_id = {}
         self.by_name = {}
         self.cls = cls
-        config_files = [ v['name'] 
-                for v in project.repository_tree(
-                    path=config_subfolder, ref=GITLAB_PROJECT_TAG)
-                if v['type']=='blob'
-                and v['name'].endswith('.json') ]
-        for configfile in config_files:
-            f = project.files.get(file_path=config_subfolder+"/"+configfile, ref=GITLAB_PROJECT_TAG)
-            jsonstr = f.decode()
+        jsonstrs = [ files[path] for path in sorted(files)
+                if path.startswith(config_subfolder+"/")
+                and '/' not in path[len(config_subfolder)+1:] ]
+
+        for jsonstr in jsonstrs:
             obj = json.loads(jsonstr, object_hook=cls.from_json)
             key = create_key(str(obj))
             identifier = obj.id
@@ -109,7 +172,12 @@ class ConfigurationRegistry:
         return "\n".join([i.key for i in self.items])
 
     def __contains__(self,index):
-        return index in self.__dir__()
+        try:
+            return (index in self.by_key) or (index in self.by_id)
+        except TypeError:
+            # unhashable objects, like parcellations, are compared to the
+            # keys and ids one by one
+            return index in self.__dir__()
 
     def __getattr__(self,name):
         if name in self.by_key.keys():
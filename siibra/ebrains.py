@@ -12,12 +12,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import requests
 import json
 
 from . import logger
 from .authentication import Authentication
-from .retrieval import cached_get
+from .retrieval import cached_get,SESSION
+
+try:
+    # orjson parses the large KG query results considerably faster
+    import orjson
+    HAVE_ORJSON=True
+except Exception as e:
+    HAVE_ORJSON=False
 
 authentication = Authentication.instance()
 
@@ -28,7 +34,10 @@ def upload_schema_from_file(file, org, domain, schema, version, query_id):
     """
     url = "https://kg.humanbrainproject.eu/query/{}/{}/{}/{}/{}".format(
         org, domain, schema, version, query_id)
-    r = requests.put( url, data=open(file, 'r'),
+    # read the body upfront, so that retried requests send it again in full
+    with open(file,'rb') as f:
+        data = f.read()
+    r = SESSION.put( url, data=data,
             headers={
                 'Content-Type':'application/json',
                 'Authorization': 'Bearer {}'.format(authentication.get_token())
@@ -51,5 +60,7 @@ def execute_query_by_id(org, domain, schema, version, query_id, params={}):
             }, 
             msg_if_not_cached="No cached data. Will now run EBRAINS KG query. This may take a while...",
            params=params)
+    if HAVE_ORJSON:
+        return orjson.loads(r)
     return json.loads(r)
 
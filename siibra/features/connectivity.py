@@ -16,6 +16,7 @@ import json
 import numpy as np
 import warnings
 from gitlab import Gitlab
+from memoization import cached
 
 from .. import logger
 from ..region import Region
@@ -24,6 +25,26 @@ from .extractor import FeatureExtractor
 from ..termplot import FontStyles as style
 from .. import termplot,parcellations
 
+@cached
+def _load_connectivity_jsons():
+    """
+    Fetch and parse the connectivity json files from their gitlab repository.
+    Both connectivity extractors build their features from the same files, so
+    they are loaded only once.
+
+    Return
+    ------
+    List of (filename, data) tuples
+    """
+    project = Gitlab('https://jugit.fz-juelich.de').projects.get(3009)
+    jsonfiles = [f['name'] 
+            for f in project.repository_tree() 
+            if f['type']=='blob' 
+            and f['name'].endswith('json')]
+    return [ (jsonfile, json.loads(
+                project.files.get(file_path=jsonfile, ref='master').decode()))
+            for jsonfile in jsonfiles ]
+
 class ConnectivityProfile(RegionalFeature):
 
     show_as_log = True
@@ -90,17 +111,9 @@ class ConnectivityProfileExtractor(FeatureExtractor):
 
         FeatureExtractor.__init__(self)
 
-        project = Gitlab('https://jugit.fz-juelich.de').projects.get(3009)
-        jsonfiles = [f['name'] 
-                for f in project.repository_tree() 
-                if f['type']=='blob' 
-                and f['name'].endswith('json')]
-
         minval = maxval = 0
         new_profiles = []
-        for jsonfile in jsonfiles: 
-            f = project.files.get(file_path=jsonfile, ref='master')
-            data = json.loads(f.decode())
+        for jsonfile,data in _load_connectivity_jsons(): 
             src_name = data['name']
             src_info  = data['description']
             src_file = jsonfile
@@ -146,15 +159,8 @@ class ConnectivityMatrixExtractor(FeatureExtractor):
 
         FeatureExtractor.__init__(self)
 
-        project = Gitlab('https://jugit.fz-juelich.de').projects.get(3009)
-        jsonfiles = [f['name'] 
-                for f in project.repository_tree() 
-                if f['type']=='blob' 
-                and f['name'].endswith('json')]
-        for jsonfile in jsonfiles: 
-            f = project.files.get(file_path=jsonfile, ref='master')
+        for _,data in _load_connectivity_jsons(): 
             profiles = []
-            data = json.loads(f.decode())
             src_name = data['name']
             src_info  = data['description']
             parcellation = parcellations[data['parcellation id']]
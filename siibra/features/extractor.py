@@ -14,7 +14,7 @@
 
 from collections import defaultdict
 from abc import ABC
-from .feature import Feature
+from .feature import Feature,SpatialFeature
 
 class FeatureExtractor(ABC):
     """
@@ -32,12 +32,34 @@ class FeatureExtractor(ABC):
         Returns the list of features from this extractor that are associated with
         the selected region of the given atlas object.
         """
+        # spatial features are tested in batches, unless their type defines
+        # its own matching
+        if ( issubclass(self._FEATURETYPE,SpatialFeature) 
+                and self._FEATURETYPE.matches is SpatialFeature.matches ):
+            return self._pick_spatial_selection(atlas)
         selection = []
         for feature in self.features:
             if feature.matches(atlas):
                 selection.append(feature)
         return selection
 
+    def _pick_spatial_selection(self,atlas):
+        """
+        Selection of spatial features. Instead of testing each feature location
+        on its own, all locations in the same space are tested against the
+        selection mask at once. The original feature order is kept.
+        """
+        by_space = defaultdict(list)
+        for index,feature in enumerate(self.features):
+            by_space[feature.space].append(index)
+        selected = [False]*len(self.features)
+        for space,indices in by_space.items():
+            hits = atlas.coordinates_selected(
+                    space,[self.features[i].location for i in indices])
+            for index,hit in zip(indices,hits):
+                selected[index] = bool(hit)
+        return [f for f,s in zip(self.features,selected) if s]
+
     def __str__(self):
         return "\n".join([str(f) for f in self.features])
 
@@ -60,7 +82,7 @@ class FeatureExtractorRegistry:
         return list(self._extractors.keys())
 
     def __contains__(self,index):
-        return index in self.__dir__()
+        return index in self._extractors
 
     def __getattr__(self,name):
         if name in self._extractors.keys():
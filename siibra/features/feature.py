@@ -20,6 +20,10 @@ class Feature(ABC):
     Abstract base class for all data features.
     """
 
+    # Subclasses that are instantiated in large numbers can declare
+    # __slots__ to avoid a per-instance __dict__.
+    __slots__ = ()
+
     @abstractmethod
     def matches(self,atlas):
         """
@@ -40,6 +44,8 @@ class SpatialFeature(Feature):
     Base class for coordinate-anchored data features.
     """
 
+    __slots__ = ('space','location')
+
     def __init__(self,space,location):
         self.space = space
         self.location = location
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 from xml.etree import ElementTree
+from io import BytesIO
 import numpy as np
 import json
 import siibra
@@ -20,12 +21,16 @@ from siibra import retrieval,spaces,logger
 from .feature import SpatialFeature
 from .extractor import FeatureExtractor
 from os import path
+from concurrent.futures import ThreadPoolExecutor
 
 class GeneExpression(SpatialFeature):
     """
     A spatial feature type for gene expressions.
     """
 
+    # one instance per microarray sample, so keep them small
+    __slots__ = ('expression_levels','z_scores','donor_info','gene','probe_ids','mri_coord')
+
     def __init__(self,gene,space,location,expression_levels,z_scores,probe_ids,donor_info,mri_coord=None):
         """
         Construct the spatial feature for gene expressions measured in a sample.
@@ -95,7 +100,7 @@ https://alleninstitute.org/legal/terms-use/."""
 
     _BASE_URL = "http://api.brain-map.org/api/v2/data"
     _QUERY = {
-        "probe" : _BASE_URL+"/query.xml?criteria=model::Probe,rma::criteria,[probe_type$eq'DNA'],products[abbreviation$eq'HumanMA'],gene[acronym$eq{gene}],rma::options[only$eq'probes.id']",
+        "probe" : _BASE_URL+"/query.xml?criteria=model::Probe,rma::criteria,[probe_type$eq'DNA'],products[abbreviation$eq'HumanMA'],gene[acronym$eq{gene}],rma::options[only$eq'probes.id']&num_rows=all",
         "specimen" : _BASE_URL+"/Specimen/query.json?criteria=[name$eq'{specimen_id}']&include=alignment3d",
         "microarray" : _BASE_URL+"/query.json?criteria=service::human_microarray_expression[probes$in{probe_ids}][donors$eq{donor_id}]",
         "gene" : _BASE_URL+"/Gene/query.json?criteria=products[abbreviation$eq'HumanMA']&num_rows=all",
@@ -134,33 +139,59 @@ https://alleninstitute.org/legal/terms-use/."""
         self.gene = gene
 
         if not self.__class__._notification_shown:
-            print(self.__class__.ALLEN_ATLAS_NOTIFICATION) 
+            logger.info(self.__class__.ALLEN_ATLAS_NOTIFICATION)
             self.__class__._notification_shown=True
         logger.info("Retrieving probe ids for gene {}".format(gene))
         url = self._QUERY['probe'].format(gene=gene)
         response = retrieval.cached_get(url)
-        root = ElementTree.fromstring(response)
-        num_probes = int(root.attrib['total_rows'])
-        probe_ids = [int(root[0][i][0].text) for i in range(num_probes)]
-
-        # get specimen information
-        self._specimen = {
-                spcid:self._retrieve_specimen(spcid) 
-                for spcid in self._SPECIMEN_IDS}
-        response = json.loads(retrieval.cached_get(self._QUERY['factors']))
-        self.factors = {
-                item['id']: {
-                    'race' : item['race_only'],
-                    'gender' : item['sex'],
-                    'age' : int(item['age']['days']/365)
-                    }
-                for item in response['msg'] }
-
-        # get expression levels and z_scores for the gene
-        for donor_id in self._DONOR_IDS:
-            self._retrieve_microarray(donor_id,probe_ids)
+        probe_ids = self._parse_probe_ids(response)
+
+        # The specimen, donor factor and microarray queries are independent, so
+        # they are issued concurrently. Features are registered afterwards, in
+        # donor order.
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            specimen_jobs = {
+                    spcid:executor.submit(self._retrieve_specimen,spcid)
+                    for spcid in self._SPECIMEN_IDS}
+            factors_job = executor.submit(
+                    retrieval.cached_get,self._QUERY['factors'])
+            microarray_jobs = [
+                    executor.submit(self._fetch_microarray,donor_id,probe_ids)
+                    for donor_id in self._DONOR_IDS]
+
+            # get specimen information
+            self._specimen = {
+                    spcid:job.result() 
+                    for spcid,job in specimen_jobs.items()}
+            response = json.loads(factors_job.result())
+            self.factors = {
+                    item['id']: {
+                        'race' : item['race_only'],
+                        'gender' : item['sex'],
+                        'age' : int(item['age']['days']/365)
+                        }
+                    for item in response['msg'] }
+
+            # get expression levels and z_scores for the gene
+            for job in microarray_jobs:
+                self._retrieve_microarray(*job.result())
 
 
+    @staticmethod
+    def _parse_probe_ids(response):
+        """
+        Extract the probe ids from the xml response of a probe query. The xml
+        is parsed incrementally and each element is released once read, so no
+        full element tree is built.
+        """
+        # a dict keeps the first occurrence of each id in response order
+        probe_ids = {}
+        for _,elem in ElementTree.iterparse(BytesIO(response),events=('end',)):
+            if elem.tag=='id':
+                probe_ids[int(elem.text)] = None
+            elem.clear()
+        return list(probe_ids)
+
     def _retrieve_specimen(self,specimen_id):
         """
         Retrieves information about a human specimen. 
@@ -181,42 +212,65 @@ https://alleninstitute.org/legal/terms-use/."""
             [T['tvr_06'], T['tvr_07'], T['tvr_08'], T['tvr_11']] ])
         return specimen
 
-    def _retrieve_microarray(self,donor_id, probe_ids):
-        """
-        Retrieve microarray data for several probes of a given donor, and
-        compute the MRI position of the corresponding tissue block in the ICBM
-        152 space to generate a SpatialFeature object for each sample.
+    def _fetch_microarray(self,donor_id, probe_ids):
         """
+        Query the microarray data for several probes of a given donor.
 
-        # query the microarray data for this donor
+        Return
+        ------
+        probes, samples : the probe and sample lists of the response
+        """
         url = self._QUERY['microarray'].format(
                 probe_ids=','.join([str(id) for id in probe_ids]),
                 donor_id=donor_id)
         response = json.loads(retrieval.cached_get(url))
         if not response['success']:
             raise Exception('Invalid response when retrieving microarray data: {}'.format( url))
+        return [response['msg'][n] for n in ['probes','samples']]
+
+    def _retrieve_microarray(self,probes,samples):
+        """
+        Compute the MRI position of the tissue blocks of the given microarray
+        samples in the ICBM 152 space to generate a SpatialFeature object for
+        each sample.
+        """
+
+        if len(samples)==0:
+            return
 
-        # store probes
-        probes,samples = [response['msg'][n] for n in ['probes','samples']]
+        # Convert the MRI coordinates of the samples to ICBM MNI152 space,
+        # using one matrix product per donor for all of its samples.
+        donors = [{k:sample['donor'][k] for k in ['name','id']} 
+                for sample in samples]
+        mri = np.ones((len(samples),4))
+        mri[:,:3] = [sample['sample']['mri'] for sample in samples]
+        icbm_coords = np.empty((len(samples),3))
+        names = np.array([donor['name'] for donor in donors])
+        for name in set(names):
+            rows = names==name
+            icbm_coords[rows] = np.dot(
+                    mri[rows],self._specimen[name]['donor2icbm'].T)
 
-        # store samples. Convert their MRI coordinates of the samples to ICBM
-        # MNI152 space
-        for i,sample in enumerate(samples):
+        # convert the probe measurements to (probes x samples) arrays once,
+        # instead of indexing every probe list for every sample. The explicit
+        # shape keeps the sample axis when there are no probes.
+        shape = (len(probes),len(samples))
+        expression_levels = np.array(
+                [p['expression_level'] for p in probes],dtype=float).reshape(shape)
+        z_scores = np.array([p['z-score'] for p in probes],dtype=float).reshape(shape)
+        probe_ids = [p['id'] for p in probes]
 
-            # coordinate conversion to ICBM152 standard space
-            donor = {k:sample['donor'][k] for k in ['name','id']}
-            icbm_coord = np.matmul(
-                    self._specimen[donor['name']]['donor2icbm'],
-                    sample['sample']['mri']+[1] ).T
+        # store samples
+        for i,(sample,donor,icbm_coord) in enumerate(zip(samples,donors,icbm_coords)):
 
             # Create the spatial feature
             self.register( GeneExpression( 
                 self.gene,
                 icbm_coord, 
                 spaces.MNI152_2009C_NONL_ASYM,
-                expression_levels = [float(p['expression_level'][i]) for p in probes],
-                z_scores = [float(p['z-score'][i]) for p in probes],
-                probe_ids = [p['id'] for p in probes],
+                expression_levels = expression_levels[:,i].tolist(),
+                z_scores = z_scores[:,i].tolist(),
+                probe_ids = probe_ids,
                 donor_info = {**self.factors[donor['id']], **donor},
                 mri_coord = sample['sample']['mri']
                 ))
@@ -16,6 +16,7 @@ import io
 import PIL.Image as Image
 from os import path
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 import re
 
 from .feature import RegionalFeature
@@ -253,7 +254,12 @@ def unify_stringlist(L: list):
         unify_stringlist(['a','a','b','a','c']) -> ['a','a*','b','a**','c']
     """
     assert(all([isinstance(l,str) for l in L]))
-    return [L[i]+"*"*L[:i].count(L[i]) for i in range(len(L))]
+    seen = {}
+    result = []
+    for s in L:
+        result.append(s+"*"*seen.get(s,0))
+        seen[s] = seen.get(s,0)+1
+    return result
 
 def edits1(word):
     """
@@ -269,6 +275,9 @@ def edits1(word):
     inserts    = [L + c + R               for L, R in splits for c in letters]
     return set(deletes + transposes + replaces + inserts)
 
+# precompiled, since it is applied to every value of a table
+_BACKSLASHES = re.compile(r"\\+")
+
 def decode_tsv(url):
     bytestream = get_bytestream_from_file(url)
     header = bytestream.readline()
@@ -284,7 +293,7 @@ def decode_tsv(url):
             "/".join(keys), url))
     assert(len(keys)==len(set(keys)))
     return  { l.split(sep)[0].decode('utf8') : dict(
-        zip(keys, [re.sub(r"\\+",r"\\",v.decode('utf8').strip()) for v in l.split(sep)])) 
+        zip(keys, [_BACKSLASHES.sub(r"\\",v.decode('utf8').strip()) for v in l.split(sep)])) 
         for l in lines }
 
 
@@ -390,24 +399,28 @@ class ReceptorDistribution(RegionalFeature):
 
         logger.debug('Loading receptor data for'+self.region)
 
+        # Download the tables concurrently into the local cache first, the
+        # sequential parsing below then reads them from disk.
+        tables = [url for url in self.files
+                if self._is_profile_table(url) or '_fp_' in url]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(retrieval.download_file,tables))
+
         for url in self.files:
 
             # Receive cortical profiles, if any
-            if '_pr_' in url:
-                suffix = path.splitext(url)[-1]
-                if suffix == '.tsv':
-                    rtype, basename = url.split("/")[-2:]
-                    if rtype in basename:
-                        data = decode_tsv(url)
-                        units = {list(v.values())[3] for v in data.values()}
-                        assert(len(units)==1)
-                        self.__profile_unit=next(iter(units))
-                        # column headers are sometimes messed up, so we fix the 2nd value
-                        densities = {int(k):float(list(v.values())[2]) 
-                                for k,v in data.items()
-                                if k.isnumeric()}
-                        rtype = self._check_rtype(rtype)
-                        self.__profiles[rtype] = densities
+            if self._is_profile_table(url):
+                rtype = url.split("/")[-2]
+                data = decode_tsv(url)
+                units = {list(v.values())[3] for v in data.values()}
+                assert(len(units)==1)
+                self.__profile_unit=next(iter(units))
+                # column headers are sometimes messed up, so we fix the 2nd value
+                densities = {int(k):float(list(v.values())[2]) 
+                        for k,v in data.items()
+                        if k.isnumeric()}
+                rtype = self._check_rtype(rtype)
+                self.__profiles[rtype] = densities
 
             # Receive autoradiographs, if any
             if '_ar_' in url:
@@ -423,6 +436,17 @@ class ReceptorDistribution(RegionalFeature):
 
         self.active = True
 
+    @staticmethod
+    def _is_profile_table(url):
+        """
+        Test wether the url points to a cortical profile table of the
+        receptor type named by its parent folder.
+        """
+        if '_pr_' not in url or path.splitext(url)[-1]!='.tsv':
+            return False
+        rtype, basename = url.split("/")[-2:]
+        return rtype in basename
+
     def _check_rtype(self,rtype):
         """ 
         Verify that the receptor type name matches the symbol table. 
@@ -21,12 +21,15 @@ from .commons import create_key
 import numbers
 import numpy as np
 import nibabel as nib
-from nilearn import image
 from enum import Enum
-from tqdm import tqdm
 from memoization import cached
-from scipy.ndimage import gaussian_filter
 from .volume_src import VolumeSrc
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict
+
+# keys a json object needs to provide to be decoded by from_json(). This is
+# checked for every object in a json stream, so it is built only once.
+_PARCELLATION_KEYS = frozenset(['@id','name','shortName','maps','regions'])
 
 class Parcellation:
 
@@ -40,6 +43,8 @@ class Parcellation:
         self.maps = {}
         self.volume_src = {}
         self.regiontree = Region(self.name,self)
+        # maps already built by get_map(), keyed by their request parameters
+        self._maps_cache = {}
 
     def get_volume_src(self, space: Space):
         """
@@ -59,7 +64,6 @@ class Parcellation:
                 str(self), str(space) ))
         return self.volume_src[space]
 
-    @cached
     def get_map(self, space: Space, resolution=None, regional=False, squeeze=True ):
         """
         Get the volumetric maps for the parcellation in the requested
@@ -92,8 +96,12 @@ class Parcellation:
             raise ValueError('Parcellation "{}" does not provide a map for space "{}"'.format(
                 str(self), str(space) ))
 
-        maptype = ParcellationMap.MapType.REGIONAL_MAPS if regional else ParcellationMap.MapType.LABELLED_VOLUME
-        return ParcellationMap(self,space,resolution=resolution, maptype=maptype, squeeze=squeeze)
+        # keyed by the space id, which is cheaper to hash than the arguments
+        key = (space.id,resolution,bool(regional),bool(squeeze))
+        if key not in self._maps_cache:
+            maptype = ParcellationMap.MapType.REGIONAL_MAPS if regional else ParcellationMap.MapType.LABELLED_VOLUME
+            self._maps_cache[key] = ParcellationMap(self,space,resolution=resolution, maptype=maptype, squeeze=squeeze)
+        return self._maps_cache[key]
 
     @property
     def labels(self):
@@ -136,15 +144,62 @@ class Parcellation:
         ------
         Region object
         """
-        candidates = self.regiontree.find(regionspec,select_uppermost=True,mapindex=mapindex)
+        # Decoded regions are cached with the region tree, which drops them
+        # when the tree changes. This also avoids copying the subtrees of
+        # group regions again on repeated lookups.
+        cache = self.regiontree._cache
+        cachekey = ('decode',regionspec,mapindex)
+        try:
+            return cache[cachekey]
+        except KeyError:
+            pass
+        except TypeError:
+            # unhashable specification, cannot be cached
+            cachekey = None
+
+        if isinstance(regionspec,(int,Region)):
+            candidates = self._lookup_regions(regionspec,mapindex)
+        else:
+            candidates = self.regiontree.find(regionspec,select_uppermost=True,mapindex=mapindex)
         if not candidates:
             raise ValueError("Regionspec {} could not be decoded under '{}'".format(
                 regionspec,self.name))
         elif len(candidates)==1:
-            return candidates[0]
+            region = candidates[0]
         else:
-            return Region._build_grouptree(candidates,self)
-
+            region = Region._build_grouptree(candidates,self)
+        if cachekey is not None:
+            cache[cachekey] = region
+        return region
+
+
+    def _lookup_regions(self,regionspec,mapindex=None):
+        """
+        Equivalent of regiontree.find(regionspec,select_uppermost=True) for
+        label indices and region objects, using lookup tables built with a
+        single pass over the region tree instead of a full tree search.
+        """
+        cache = self.regiontree._cache
+        if 'lookup' not in cache:
+            by_label = defaultdict(list)
+            by_key = defaultdict(list)
+            for region in self:
+                if region.labelindex is not None:
+                    by_label[region.labelindex].append(region)
+                by_key[region.key].append(region)
+            cache['lookup'] = (by_label,by_key)
+        by_label,by_key = cache['lookup']
+
+        if isinstance(regionspec,Region):
+            candidates = by_key.get(regionspec.key,[])
+        else:
+            candidates = by_label.get(regionspec,[])
+            if mapindex:
+                candidates = [r for r in candidates if r.mapindex==mapindex]
+        if len(candidates)>1:
+            mindepth = min(r.depth for r in candidates)
+            candidates = [r for r in candidates if r.depth==mindepth]
+        return list(candidates)
 
     def find_regions(self,regionspec):
         """
@@ -179,10 +234,7 @@ class Parcellation:
         if isinstance(other,Parcellation):
             return self.id==other.id
         elif isinstance(other,str):
-            return any([
-                self.name==other, 
-                self.key==other,
-                self.id==other])
+            return self.name==other or self.key==other or self.id==other
         else:
             raise ValueError("Cannot compare object of type {} to Parcellation".format(type(other)))
 
@@ -190,7 +242,11 @@ class Parcellation:
         """
         Returns an iterator that goes through all regions in this parcellation
         """
-        return self.regiontree.__iter__()
+        # the flattened tree is cached until the region tree changes
+        cache = self.regiontree._cache
+        if 'regions' not in cache:
+            cache['regions'] = tuple(self.regiontree)
+        return iter(cache['regions'])
 
     @staticmethod
     def from_json(obj):
@@ -198,8 +254,7 @@ class Parcellation:
         Provides an object hook for the json library to construct a Parcellation
         object from a json stream.
         """
-        required_keys = ['@id','name','shortName','maps','regions']
-        if any([k not in obj for k in required_keys]):
+        if not _PARCELLATION_KEYS.issubset(obj):
             return obj
 
         # create the parcellation, it will create a parent region node for the regiontree.
@@ -235,6 +290,19 @@ def _assert_homogeneous_3d(xyz):
         return np.r_[xyz,1]
 
 
+def _as_uint(arr):
+    """
+    Convert an array of non-negative label values to the smallest unsigned
+    integer type that can represent all of them.
+    """
+    arr = np.asanyarray(arr)
+    if arr.dtype.kind=='f':
+        # non-finite values carry no label, they are mapped to background
+        arr = np.where(np.isfinite(arr),arr,0)
+    maxval = int(arr.max()) if arr.size>0 else 0
+    return arr.astype(np.min_scalar_type(max(maxval,0)))
+
+
 class ParcellationMap:
 
     """
@@ -329,6 +397,7 @@ class ParcellationMap:
         # check for available maps per region
         self.maploaders = []
         self.regions = {} # indexed by (labelindex,mapindex)
+        self._mapindices = {} # reverse lookup: region -> mapindex
 
         if maptype==ParcellationMap.MapType.LABELLED_VOLUME:
             for mapindex,url in enumerate(self.parcellation.maps[self.space]):
@@ -341,18 +410,20 @@ class ParcellationMap:
                         region = self.parcellation.decode_region(int(labelindex),mapindex)
                         if labelindex>0:
                             self.regions[labelindex,mapindex] = region
+                            self._mapindices[region] = mapindex
 
         elif maptype==ParcellationMap.MapType.REGIONAL_MAPS:
             regions = [r for r in parcellation.regiontree if r.has_regional_map(space)]
             labelindex = -1
             for region in regions:
-                if region in self.regions.values():
+                if region in self._mapindices:
                     logger.debug(f"Region already seen in tree: {region.key}")
                     continue
                 #regionmap = self._load_regional_map(region)
                 self.maploaders.append(lambda quiet=False,region=region:self._load_regional_map(region,quiet=quiet))
                 mapindex = len(self.maploaders)-1
                 self.regions[labelindex,mapindex] = region
+                self._mapindices[region] = mapindex
 
         else:
             raise ValueError("Invalid maptype requested.")
@@ -363,6 +434,7 @@ class ParcellationMap:
         Use with caution, this might get large!
         """
         if len(self)>1:
+            from nilearn import image
             logger.info(f'Concatenating {len(self)} 3D volumes into the final parcellation map...')
             mapimg = image.concat_imgs((fnc() for fnc in self.maploaders))
             return nib.Nifti1Image(mapimg.dataobj,mapimg.affine)
@@ -388,6 +460,7 @@ class ParcellationMap:
         """
         m = None
         if url=="collect":
+            from nilearn import image
 
             # build a 3D volume from the list of all regional maps
             if not quiet:
@@ -397,26 +470,37 @@ class ParcellationMap:
             regions = [r for r in self.parcellation.regiontree 
                     if r.has_regional_map(self.space)]
             m = None
-            for region in regions:
-                assert(region.labelindex)
+            dtype = np.min_scalar_type(
+                    max([r.labelindex for r in regions if r.labelindex]+[0]))
+
+            # regional maps are fetched concurrently, since this is dominated
+            # by network and disk access. Aggregation stays sequential.
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                masks = list(executor.map(
+                    lambda r: self._load_regional_map(r,quiet=quiet), regions))
 
-                # load region mask
-                mask_ = self._load_regional_map(region)
+            for region,mask_ in zip(regions,masks):
+                assert(region.labelindex)
                 if not mask_:
                     continue
                 if mask_.dataobj.dtype.kind!='u':
                     if not quiet:
                         logger.warning('Parcellation maps expect unsigned integer type, but the fetched image data has type "{}". Will convert to int explicitly.'.format(mask_.dataobj.dtype))
-                    mask_ = nib.Nifti1Image(np.asanyarray(mask_.dataobj).astype('uint'),m.affine)
+                    mask_ = nib.Nifti1Image(_as_uint(mask_.dataobj),mask_.affine)
 
-                # build up the aggregated mask with labelled indices
+                # build up the aggregated mask with labelled indices. It is
+                # allocated as a fresh array, since the regional maps are
+                # cached and must not be modified.
                 if m is None:
-                    m = mask_
-                if mask_.shape!=m.shape:
-                    mask = image.resample_to_img(mask_,m,interpolation='nearest')
-                else:
+                    m = nib.Nifti1Image(
+                        np.zeros(mask_.shape,dtype=dtype),
+                        mask_.affine)
+                # resampling is only needed if the voxel grids differ
+                if mask_.shape==m.shape and np.array_equal(mask_.affine,m.affine):
                     mask = mask_
-                m.dataobj[mask.dataobj>0] = region.labelindex
+                else:
+                    mask = image.resample_to_img(mask_,m,interpolation='nearest')
+                m.dataobj[np.asanyarray(mask.dataobj)>0] = region.labelindex
 
         elif is_ngprecomputed(url):
             m = load_ngprecomputed(url,self.resolution)
@@ -428,7 +512,7 @@ class ParcellationMap:
                 if m.dataobj.dtype.kind!='u':
                     if not quiet:
                         logger.warning('Parcellation maps expect unsigned integer type, but the fetched image data has type "{}". Will convert to int explicitly.'.format(m.dataobj.dtype))
-                    m = nib.Nifti1Image(np.asanyarray(m.dataobj).astype('uint'),m.affine)
+                    m = nib.Nifti1Image(_as_uint(m.dataobj),m.affine)
 
         if not m:
             return None
@@ -491,9 +575,7 @@ class ParcellationMap:
         if isinstance(spec,int):
             return spec in range(len(self.maploaders))
         elif isinstance(spec,Region):
-            for _,region in self.regions.items():
-                if region==spec:
-                    return True
+            return spec in self._mapindices
         return False
 
     def __getitem__(self,spec):
@@ -515,9 +597,7 @@ class ParcellationMap:
         if isinstance(spec,int):
             sliceindex=spec
         else:
-            for (_,mapindex),region in self.regions.items():
-                if region==spec:
-                    sliceindex = mapindex
+            sliceindex = self._mapindices.get(spec)
         if sliceindex is None:
             raise RuntimeError(f"Invalid index '{spec}' for accessing this ParcellationMap.")
 
@@ -538,7 +618,7 @@ class ParcellationMap:
             Index of the fourth dimension of a labelled volume with more than
             a single parcellation map.
         """
-        if self.MapType==ParcellationMap.MapType.LABELLED_VOLUME:
+        if self.maptype==ParcellationMap.MapType.LABELLED_VOLUME:
             return self.regions[index,mapindex]
         else:
             return self.regions[-1,index]
@@ -564,7 +644,7 @@ class ParcellationMap:
             mapimg = self[region] 
             index = region.labelindex
             return nib.Nifti1Image(
-                    dataobj=(np.asarray(mapimg.dataobj)==index).astype(int),
+                    dataobj=(np.asarray(mapimg.dataobj)==index).astype('uint8'),
                     affine=mapimg.affine)
         else:
             return self[region]
@@ -578,6 +658,8 @@ class ParcellationMap:
         with the same dimensions and affine as the template, including
         the heatmap.
         """
+        from scipy.ndimage import gaussian_filter
+        from nilearn import image
         xyzh = _assert_homogeneous_3d(xyz_phys)
 
         # position in voxel coordinates
@@ -616,6 +698,7 @@ class ParcellationMap:
         Compute a 3D Gaussian kernel for the voxel space of the given reference
         image, matching its bandwidth provided in physical coordinates.
         """
+        from scipy.ndimage import gaussian_filter
         scaling = np.array([np.linalg.norm(refimg.affine[:,i]) 
                             for i in range(3)]).mean()
         sigma_vox = sigma_phys / scaling
@@ -678,18 +761,22 @@ class ParcellationMap:
                 f"Performing assignment of {numpts} deterministic coordinates "
                 f"to {len(self)} maps."))
 
-        probs = {i:[] for i in range(numpts)}
+        from tqdm import tqdm
+
+        # map values of each point (rows) in each regional map (columns)
+        probs = np.zeros((numpts,len(self)))
         for mapindex,loadfnc in tqdm(enumerate(self.maploaders),total=len(self)):
 
             pmap = loadfnc(quiet=True)
-            assert(pmap.dataobj.dtype.kind=='f')
             if not pmap:
                 logger.warning(f"Could not load regional map for {self.regions[-1,mapindex].name}")
-                for i in range(numpts):
-                    probs[i].append(-1)
+                probs[:,mapindex] = -1
                 continue
+            assert(pmap.dataobj.dtype.kind=='f')
             phys2vox = np.linalg.inv(pmap.affine)
             A = np.asanyarray(pmap.dataobj)
+            # voxel coordinates of all points at once
+            XYZ_vox = (np.dot(XYZH,phys2vox.T)+.5).astype('int')
 
             if sigma_phys>0:
 
@@ -698,8 +785,7 @@ class ParcellationMap:
                 kernel = ParcellationMap._kernelimg(pmap,sigma_phys,sigma_point)
                 r = int(kernel.shape[0]/2) # effective radius
 
-                for i,xyzh in enumerate(XYZH):
-                    xyz_vox = (np.dot(phys2vox,xyzh)+.5).astype('int')
+                for i,xyz_vox in enumerate(XYZ_vox):
                     x0,y0,z0 = [v-r for v in xyz_vox[:3]]
                     xs,ys,zs = [max(-v,0) for v in (x0,y0,z0)] # possible offsets
                     x1,y1,z1 = [min(xyz_vox[i]+r+1,A.shape[i]) for i in range(3)]
@@ -709,22 +795,19 @@ class ParcellationMap:
                     mapdata = A[x0+xs:x1,y0+ys:y1,z0+zs:z1] 
                     weights = kernel[xs:xs+xd,ys:ys+yd,zs:zs+zd]
                     assert(np.all(weights.shape==mapdata.shape))
-                    prob = np.sum(np.multiply(weights,mapdata))
-                    probs[i].append(prob)
+                    probs[i,mapindex] = np.sum(np.multiply(weights,mapdata))
 
             else:
-                # just read out the coordinate
-                for i,xyzh in enumerate(XYZH):
-                    xyz_vox = (np.dot(phys2vox,xyzh)+.5).astype('int')
-                    x,y,z,_ = xyz_vox
-                    probs[i].append(A[x,y,z])
+                # just read out the coordinates
+                X,Y,Z = XYZ_vox[:,:3].T
+                probs[:,mapindex] = A[X,Y,Z]
 
 
         matches = [
                 {self.decode_region(index):round(prob*100,2)
                     for index,prob in enumerate(P) 
                     if prob>0 }
-                for P in probs.values() ]
+                for P in probs ]
 
         assignments = [
                 [(region,prob_percent) for region,prob_percent
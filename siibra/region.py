@@ -19,13 +19,21 @@ from .retrieval import download_file
 from .space import Space
 from .bigbrain import is_ngprecomputed,load_ngprecomputed
 import numpy as np
-from skimage import measure
 from nibabel.affines import apply_affine
 import nibabel as nib
 from memoization import cached
 import re
 import anytree
 
+# precompiled, since region names are split for every name match
+_WORD_SEPARATOR = re.compile('[^a-zA-Z0-9.]')
+
+def _split_words(s):
+    """
+    Split a string into its lowercase words.
+    """
+    return [w for w in _WORD_SEPARATOR.split(s.lower()) if len(w)>0]
+
 class Region(anytree.NodeMixin):
     """
     Representation of a region with name and more optional attributes
@@ -57,6 +65,9 @@ class Region(anytree.NodeMixin):
         self.labelindex = labelindex
         self.mapindex = mapindex
         self.attrs = attrs
+        # results derived from the subtree, cleared whenever the tree below changes
+        self._cache = {}
+        self._namewords = None
         self.parent = parent
         if children:
             self.children = children
@@ -86,7 +97,24 @@ class Region(anytree.NodeMixin):
 
     @property
     def names(self):
-        return Glossary([r.key for r in self])
+        if 'names' not in self._cache:
+            self._cache['names'] = Glossary([r.key for r in self])
+        return self._cache['names']
+
+    def _clear_cache(self):
+        """
+        Drop cached subtree information of this region and all its ancestors.
+        """
+        for node in (self,)+self.ancestors:
+            node._cache.clear()
+
+    def _post_attach(self,parent):
+        # anytree hook, called after this region was added below parent
+        parent._clear_cache()
+
+    def _post_detach(self,parent):
+        # anytree hook, called after this region was removed from parent
+        parent._clear_cache()
 
     def _related_ebrains_files(self):
         """
@@ -159,8 +187,24 @@ class Region(anytree.NodeMixin):
         -----
         list of matching regions
         """
-        result = anytree.search.findall(self,
-                lambda node: node.matches(regionspec,mapindex))
+        # results are cached per subtree, and dropped when the tree changes.
+        cachekey = ('find',regionspec,select_uppermost,mapindex)
+        try:
+            return list(self._cache[cachekey])
+        except KeyError:
+            pass
+        except TypeError:
+            # unhashable specification, cannot be cached
+            cachekey = None
+
+        if isinstance(regionspec,str):
+            # split the specification only once, not once per node
+            words = _split_words(regionspec)
+            result = anytree.search.findall(self,
+                    lambda node: node._matches_name(regionspec,words))
+        else:
+            result = anytree.search.findall(self,
+                    lambda node: node.matches(regionspec,mapindex))
         if len(result)>1 and select_uppermost:
             all_results = result
             mindepth = min([r.depth for r in result])
@@ -170,11 +214,12 @@ class Region(anytree.NodeMixin):
                     len(result), len(all_results), regionspec))
 
         if isinstance(result,Region):
-            return [result]
+            result = [result]
         elif result is None:
-            return []
-        else:
-            return list(result)
+            result = []
+        if cachekey is not None:
+            self._cache[cachekey] = tuple(result)
+        return list(result)
 
     def matches(self,regionspec,mapindex=None):
         """ 
@@ -198,28 +243,34 @@ class Region(anytree.NodeMixin):
         -----
         True or False
         """
-        splitstr = lambda s : [w for w in re.split('[^a-zA-Z0-9.]', s) 
-                if len(w)>0]
         if isinstance(regionspec,Region):
             return self.key==regionspec.key 
         elif isinstance(regionspec,int):
             # argument is int - a labelindex is expected
             if mapindex:
-                return all([self.labelindex==regionspec,self.mapindex==mapindex])
+                return self.labelindex==regionspec and self.mapindex==mapindex
             else:
-                return all([self.labelindex==regionspec])
+                return self.labelindex==regionspec
         elif isinstance(regionspec,str):
-            # string is given, perform some lazy string matching
-            return any([
-                    all([w.lower() in splitstr(self.name.lower()) 
-                        for w in splitstr(regionspec)]),
-                    regionspec==self.key,
-                    regionspec==self.name ])
+            return self._matches_name(regionspec,_split_words(regionspec))
         else:
             raise TypeError(
                     "Cannot interpret region specification of type '{}'".format(
                         type(regionspec)))
 
+    def _matches_name(self,regionspec,words):
+        """
+        Lazy string matching of a name specification, given together with its
+        lowercase words. Exact matches are tested first, since they are cheap.
+        """
+        if regionspec==self.key or regionspec==self.name:
+            return True
+        # the words of the own name are kept until the name changes
+        if self._namewords is None or self._namewords[0]!=self.name:
+            self._namewords = (self.name,frozenset(_split_words(self.name)))
+        namewords = self._namewords[1]
+        return all(w in namewords for w in words)
+
     @cached
     def build_mask(self,space : Space, resolution=None ):
         """
@@ -257,10 +308,12 @@ class Region(anytree.NodeMixin):
                 if childmask is None: 
                     continue
                 if mask is None:
-                    mask = childmask.dataobj
+                    # copy, since the child mask is cached and will be updated
+                    # in place. Binary masks fit into uint8, like in get_mask.
+                    mask = np.array(childmask.dataobj,dtype='uint8')
                     affine = childmask.affine
                 else:
-                    mask = (mask | childmask.dataobj).astype('int')
+                    np.logical_or(mask,np.asanyarray(childmask.dataobj),out=mask)
 
         if mask is None:
             logger.warning(f"No mask could be computed for {self.name}")
@@ -470,6 +523,7 @@ class RegionProps():
         space : Space
             A template space 
         """
+        from skimage import measure
         assert(region.parcellation.supports_space(space))
 
         self.region = region
@@ -15,6 +15,8 @@
 import json
 from zipfile import ZipFile
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import hashlib
 import os
 #from os import os.path
@@ -55,6 +57,20 @@ def __compile_cachedir(suffix=None):
 CACHEDIR = __compile_cachedir()
 logger.debug('Using cache: {}'.format(CACHEDIR))
 
+# A single session is shared by all downloads, so that subsequent requests to
+# the same host reuse an open connection instead of paying a new TCP/TLS
+# handshake each time. The pool is sized for the concurrent fetches done by
+# siibra, and transient server errors are retried with a short backoff.
+SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+        pool_connections=16, pool_maxsize=16,
+        max_retries=Retry(
+            total=3, backoff_factor=0.2,
+            status_forcelist=[429,502,503,504],
+            raise_on_status=False))
+SESSION.mount('http://',_ADAPTER)
+SESSION.mount('https://',_ADAPTER)
+
 hashstr = lambda s: str(hashlib.sha256(s).hexdigest())
 
 def cachefile(str_rep,suffix=None):
@@ -95,38 +111,42 @@ def download_file(url, ziptarget=None, targetname=None ):
                 return cachename
 
     # No valid hash and corresponding file found - need to download
-    req = requests.get(url)
-    if req is not None and req.status_code == 200:
-
-        # try to figure out the original filename for the requested file
-        if targetname is not None:
-            original_filename = targetname
-        elif 'X-Object-Meta-Orig-Filename' in req.headers:
-            original_filename = req.headers['X-Object-Meta-Orig-Filename']
-        else:
-            original_filename = os.path.basename(url)
-
-        # build a uid-based alternative filename for the cache which is not redundant
-        # (but keep the original filename for reference)
-        namefields = os.path.basename(original_filename).split(".")
-        suffix =  ".".join(namefields[1:]) if len(namefields)>1 else ".".join(namefields)
-        cachename = hashfile+"."+suffix
-        filename = original_filename
-
-        # now save the file
-        with open(cachename, 'wb') as code:
-            code.write(req.content)
-
-        # if this was a zip file, and a particular target file in the zip was
-        # requested, we need to extract it now. We will later drop the zipfile.
-        if suffix.endswith("zip") and (ziptarget is not None):
-            filename = ziptarget
-            cachename = get_from_zip(
-                    cachename, ziptarget)
-        with open(hashfile, 'w') as f:
-            f.write(filename+";")
-            f.write(cachename)
-        return cachename
+    # The response body is streamed to disk in chunks, so that large volumes
+    # are never held in memory as a whole. The connection is released to the
+    # shared pool when leaving the with block, also on errors.
+    with SESSION.get(url, stream=True) as req:
+        if req.status_code == 200:
+
+            # try to figure out the original filename for the requested file
+            if targetname is not None:
+                original_filename = targetname
+            elif 'X-Object-Meta-Orig-Filename' in req.headers:
+                original_filename = req.headers['X-Object-Meta-Orig-Filename']
+            else:
+                original_filename = os.path.basename(url)
+
+            # build a uid-based alternative filename for the cache which is not redundant
+            # (but keep the original filename for reference)
+            namefields = os.path.basename(original_filename).split(".")
+            suffix =  ".".join(namefields[1:]) if len(namefields)>1 else ".".join(namefields)
+            cachename = hashfile+"."+suffix
+            filename = original_filename
+
+            # now save the file
+            with open(cachename, 'wb') as code:
+                for chunk in req.iter_content(chunk_size=1024*1024):
+                    code.write(chunk)
+
+            # if this was a zip file, and a particular target file in the zip was
+            # requested, we need to extract it now. We will later drop the zipfile.
+            if suffix.endswith("zip") and (ziptarget is not None):
+                filename = ziptarget
+                cachename = get_from_zip(
+                        cachename, ziptarget)
+            with open(hashfile, 'w') as f:
+                f.write(filename+";")
+                f.write(cachename)
+            return cachename
     '''
         - error on response status != 200
         - error on file read
@@ -154,6 +174,8 @@ def get_from_zip(zipfile, ziptarget ):
                     os.path.basename(ziptarget) )
                 if not os.path.exists(targetname):
                     os.rename(downloadname,targetname)
+                # only the first match is used, no need to scan further
+                break
     os.remove(zipfile)
     if targetname is not None:
         return targetname
@@ -161,7 +183,7 @@ def get_from_zip(zipfile, ziptarget ):
 
 
 def get_json_from_url(url):
-    req = requests.get(url)
+    req = SESSION.get(url)
     if req is not None and req.status_code == 200:
         return json.loads(req.content)
     else:
@@ -187,8 +209,8 @@ def cached_get(url,msg_if_not_cached=None,**kwargs):
             return(r)
     else:
         if msg_if_not_cached:
-            print(msg_if_not_cached)
-        r = requests.get(url,**kwargs)
+            logger.info(msg_if_not_cached)
+        r = SESSION.get(url,**kwargs)
         if r.ok:
             with open(cachefile_content,'wb') as f:
                 f.write(r.content)
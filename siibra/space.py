@@ -20,6 +20,10 @@ from . import logger
 from .volume_src import VolumeSrc
 import nibabel as nib
 
+# keys a json object needs to provide to be decoded by from_json(). This is
+# checked for every object in a json stream, so it is built only once.
+_SPACE_KEYS = frozenset(['@id','name','shortName','templateUrl','templateType'])
+
 class Space:
 
     def __init__(self, identifier, name, template_type=None, template_url=None, ziptarget=None, src_volume_type=None, volume_src=[]):
@@ -72,8 +76,7 @@ class Space:
         Provides an object hook for the json library to construct an Atlas
         object from a json stream.
         """
-        required_keys = ['@id','name','shortName','templateUrl','templateType']
-        if any([k not in obj for k in required_keys]):
+        if not _SPACE_KEYS.issubset(obj):
             return obj
 
         volume_src = [VolumeSrc.from_json(v) for v in obj['volumeSrc']] if 'volumeSrc' in obj else []
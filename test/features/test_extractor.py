@@ -0,0 +1,68 @@
+import unittest
+from unittest.mock import MagicMock
+
+from siibra.features.extractor import FeatureExtractor
+from siibra.features.feature import SpatialFeature
+
+
+class NamedSpatialFeature(SpatialFeature):
+
+    __slots__ = ('name',)
+
+    def __init__(self, name, space, location):
+        SpatialFeature.__init__(self, space, location)
+        self.name = name
+
+    def matches(self, atlas):
+        return self.name == atlas.selected_name
+
+
+class TestFeatureExtractor(unittest.TestCase):
+
+    @staticmethod
+    def make_extractor(featuretype, features):
+        extractor = FeatureExtractor()
+        extractor._FEATURETYPE = featuretype
+        for feature in features:
+            extractor.register(feature)
+        return extractor
+
+    def test_spatial_selection_keeps_order(self):
+        space1, space2 = MagicMock(), MagicMock()
+        features = [
+            SpatialFeature(space1, (1, 0, 0)),
+            SpatialFeature(space2, (-1, 0, 0)),
+            SpatialFeature(space1, (2, 0, 0)),
+            SpatialFeature(space2, (3, 0, 0)),
+            SpatialFeature(space1, (-2, 0, 0))]
+        atlas = MagicMock()
+        atlas.coordinates_selected.side_effect = \
+            lambda space, locations: [location[0] > 0 for location in locations]
+        extractor = self.make_extractor(SpatialFeature, features)
+
+        selection = extractor.pick_selection(atlas)
+        self.assertEqual(selection, [features[0], features[2], features[3]])
+        # one query per space
+        self.assertEqual(atlas.coordinates_selected.call_count, 2)
+        atlas.coordinate_selected.assert_not_called()
+
+    def test_spatial_selection_without_features(self):
+        atlas = MagicMock()
+        extractor = self.make_extractor(SpatialFeature, [])
+        self.assertEqual(extractor.pick_selection(atlas), [])
+        atlas.coordinates_selected.assert_not_called()
+
+    def test_own_matching_is_used(self):
+        space = MagicMock()
+        features = [
+            NamedSpatialFeature('a', space, (1, 0, 0)),
+            NamedSpatialFeature('b', space, (1, 0, 0))]
+        atlas = MagicMock(selected_name='b')
+        extractor = self.make_extractor(NamedSpatialFeature, features)
+
+        self.assertEqual(extractor.pick_selection(atlas), [features[1]])
+        atlas.coordinates_selected.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
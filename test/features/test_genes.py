@@ -0,0 +1,29 @@
+import unittest
+
+from siibra.features.genes import AllenBrainAtlasQuery
+
+
+class TestGenes(unittest.TestCase):
+
+    probe_xml = b"""<?xml version="1.0" encoding="UTF-8"?>
+<Response success="true" id="0" start_row="0" num_rows="4" total_rows="4">
+  <probes>
+    <probe><id>1023146</id></probe>
+    <probe><id>1023147</id></probe>
+    <probe><id>1023146</id></probe>
+    <probe><id>1056932</id></probe>
+  </probes>
+</Response>"""
+
+    def test_parse_probe_ids(self):
+        probe_ids = AllenBrainAtlasQuery._parse_probe_ids(self.probe_xml)
+        self.assertEqual(probe_ids, [1023146, 1023147, 1056932])
+
+    def test_parse_probe_ids_empty(self):
+        probe_ids = AllenBrainAtlasQuery._parse_probe_ids(
+            b'<Response success="true"><probes/></Response>')
+        self.assertEqual(probe_ids, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,8 @@
 import os
 import unittest
+from unittest.mock import MagicMock
+import numpy as np
+import nibabel as nib
 from siibra.atlas import REGISTRY
 from siibra import atlas
 from test.get_token import get_token
@@ -124,5 +127,42 @@ class TestAtlas(unittest.TestCase):
         pass
 
 
+class TestCoordinatesSelected(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # 2mm voxels, with voxel (0,0,0) at physical position (-4,-4,-4)
+        affine = np.diag([2., 2., 2., 1.])
+        affine[:3, 3] = -4
+        arr = np.zeros((4, 4, 4), dtype='uint8')
+        arr[2, 2, 3] = 1
+        mask = nib.Nifti1Image(arr, affine)
+        cls.space = MagicMock()
+        cls.atlas = atlas.Atlas('test/atlas', 'Test Atlas')
+        cls.atlas.spaces.append(cls.space)
+        cls.atlas.build_mask = lambda space, resolution=None: mask
+
+    def test_inside(self):
+        selected = self.atlas.coordinates_selected(self.space, [(0, 0, 2), (0, 0, 0)])
+        self.assertEqual(selected.tolist(), [True, False])
+
+    def test_negative(self):
+        # voxel (-2,2,3), which must not wrap around to voxel (2,2,3)
+        selected = self.atlas.coordinates_selected(self.space, [(-10, 0, 2)])
+        self.assertEqual(selected.tolist(), [False])
+
+    def test_out_of_range(self):
+        selected = self.atlas.coordinates_selected(self.space, [(4, 0, 2), (0, 0, 100)])
+        self.assertEqual(selected.tolist(), [False, False])
+
+    def test_empty(self):
+        selected = self.atlas.coordinates_selected(self.space, [])
+        self.assertEqual(len(selected), 0)
+
+    def test_single_coordinate(self):
+        self.assertTrue(self.atlas.coordinate_selected(self.space, (0, 0, 2)))
+        self.assertFalse(self.atlas.coordinate_selected(self.space, (-10, 0, 2)))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,94 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from siibra import bigbrain, retrieval
+
+
+class TestIsNgPrecomputed(unittest.TestCase):
+
+    url = "https://example.org/bigbrain/store"
+
+    def setUp(self):
+        bigbrain.is_ngprecomputed.cache_clear()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cachefile = os.path.join(self.tmpdir.name, 'probe.isng')
+        cachefile_patch = patch.object(
+            retrieval, 'cachefile', return_value=self.cachefile)
+        cachefile_patch.start()
+        self.addCleanup(cachefile_patch.stop)
+        self.session = MagicMock()
+        session_patch = patch.object(retrieval, 'SESSION', self.session)
+        session_patch.start()
+        self.addCleanup(session_patch.stop)
+
+    def tearDown(self):
+        bigbrain.is_ngprecomputed.cache_clear()
+        self.tmpdir.cleanup()
+
+    def respond(self, status_code, info=None):
+        response = MagicMock(status_code=status_code)
+        response.content = json.dumps(info).encode('utf8') if info else b'Not found'
+        self.session.get.return_value = response
+
+    def probe(self):
+        # bypass the in-memory cache, to exercise the cache on disk
+        bigbrain.is_ngprecomputed.cache_clear()
+        return bigbrain.is_ngprecomputed(self.url)
+
+    def cached_answer(self):
+        if not os.path.isfile(self.cachefile):
+            return None
+        with open(self.cachefile, 'r') as f:
+            return f.read()
+
+    def test_store_is_cached_as_positive(self):
+        self.respond(200, {'type': 'image'})
+        self.assertTrue(self.probe())
+        self.assertEqual(self.cached_answer(), '1')
+        self.assertFalse(os.path.exists(self.cachefile + ".tmp"))
+        self.respond(404)
+        self.assertTrue(self.probe())
+        self.session.get.assert_called_once_with(self.url + "/info")
+
+    def test_not_found_is_cached_as_negative(self):
+        self.respond(404)
+        self.assertFalse(self.probe())
+        self.assertEqual(self.cached_answer(), '0')
+        self.respond(200, {'type': 'image'})
+        self.assertFalse(self.probe())
+        self.assertEqual(self.session.get.call_count, 1)
+
+    def test_negative_answer_expires(self):
+        self.respond(404)
+        self.assertFalse(self.probe())
+        expired = os.path.getmtime(self.cachefile) - bigbrain._NEGATIVE_CACHE_SECONDS - 1
+        os.utime(self.cachefile, (expired, expired))
+        self.respond(200, {'type': 'segmentation'})
+        self.assertTrue(self.probe())
+        self.assertEqual(self.session.get.call_count, 2)
+        self.assertEqual(self.cached_answer(), '1')
+
+    def test_indefinite_answers_are_not_cached(self):
+        for status_code in [401, 403, 429, 500, 503]:
+            self.respond(status_code)
+            self.assertFalse(self.probe())
+            self.assertIsNone(self.cached_answer(), msg=status_code)
+
+    def test_connection_error_is_not_cached(self):
+        self.session.get.side_effect = ConnectionError()
+        self.assertFalse(self.probe())
+        self.assertIsNone(self.cached_answer())
+
+    def test_file_urls_are_not_probed(self):
+        for url in ['https://example.org/map.nii.gz', 'https://example.org/MPM.ZIP',
+                'https://example.org/map.nii', 'https://example.org/info.json']:
+            self.assertFalse(bigbrain.is_ngprecomputed(url))
+        self.session.get.assert_not_called()
+        self.assertIsNone(self.cached_answer())
+
+
+if __name__ == "__main__":
+    unittest.main()
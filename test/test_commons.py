@@ -0,0 +1,28 @@
+import unittest
+
+from siibra.commons import Glossary
+
+
+class TestGlossary(unittest.TestCase):
+
+    words = ['GABARAPL2', 'MAOA', 'TAC1']
+
+    def test_contains(self):
+        glossary = Glossary(self.words)
+        self.assertTrue('MAOA' in glossary)
+        self.assertFalse('maoa' in glossary)
+
+    def test_getattr(self):
+        glossary = Glossary(self.words)
+        self.assertEqual(glossary.TAC1, 'TAC1')
+        with self.assertRaises(AttributeError):
+            glossary.NOT_A_GENE
+
+    def test_order_preserved(self):
+        glossary = Glossary(self.words)
+        self.assertEqual(list(glossary), self.words)
+        self.assertEqual(dir(glossary), sorted(self.words))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,9 @@ import unittest
 from unittest import mock, TestCase
 import os
 import importlib
+import tarfile
+import tempfile
+from io import BytesIO
 import siibra
 
 class TestConfig1(TestCase):
@@ -22,5 +25,72 @@ class TestConfig1(TestCase):
             "develop"
         )
 
+class TestConfigurationRegistry(TestCase):
+
+    class Item:
+        # unhashable, and equal to its key like a parcellation
+        __hash__ = None
+
+        def __init__(self, key):
+            self.key = key
+
+        def __eq__(self, other):
+            return self.key == other
+
+    def setUp(self):
+        self.registry = siibra.config.ConfigurationRegistry.__new__(
+            siibra.config.ConfigurationRegistry)
+        self.registry.cls = self.Item
+        self.registry.items = [self.Item('ITEM_KEY')]
+        self.registry.by_key = {'ITEM_KEY': 0}
+        self.registry.by_id = {'item/id': 0}
+        self.registry.by_name = {'item name': 0}
+
+    def test_contains_keys_and_ids(self):
+        self.assertIn('ITEM_KEY', self.registry)
+        self.assertIn('item/id', self.registry)
+        self.assertNotIn('item name', self.registry)
+        self.assertNotIn('OTHER_KEY', self.registry)
+
+    def test_contains_unhashable(self):
+        self.assertIn(self.Item('ITEM_KEY'), self.registry)
+        self.assertNotIn(self.Item('OTHER_KEY'), self.registry)
+        self.assertNotIn(['ITEM_KEY'], self.registry)
+
+class TestConfigArchiveCache(TestCase):
+
+    @staticmethod
+    def make_archive(files):
+        buffer = BytesIO()
+        with tarfile.open(fileobj=buffer,mode='w:gz') as tar:
+            for name,content in files.items():
+                data = content.encode('utf-8')
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info,BytesIO(data))
+        return buffer.getvalue()
+
+    @mock.patch.dict(os.environ, {}, clear=True)
+    def test_broken_cached_archive_is_downloaded_again(self):
+        archive = self.make_archive({'repo-tag/spaces/a.json':'{}'})
+        project = mock.MagicMock()
+        project.repository_archive.return_value = archive
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cachefile = os.path.join(tmpdir,'config.tar.gz')
+            with open(cachefile,'wb') as f:
+                f.write(archive[:len(archive)//2])
+            with mock.patch.object(siibra.config.retrieval,'cachefile',return_value=cachefile), \
+                    mock.patch.object(siibra.config,'_get_project',return_value=project):
+                siibra.config._get_config_files.cache_clear()
+                try:
+                    files = siibra.config._get_config_files()
+                finally:
+                    siibra.config._get_config_files.cache_clear()
+            self.assertEqual(files,{'spaces/a.json':'{}'})
+            project.repository_archive.assert_called_once()
+            with open(cachefile,'rb') as f:
+                self.assertEqual(f.read(),archive)
+            self.assertFalse(os.path.exists(cachefile+".tmp"))
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+import nibabel as nib
+
+from siibra.parcellation import _as_uint, Parcellation, ParcellationMap
+from siibra.region import Region
+
+
+class TestAsUint(unittest.TestCase):
+
+    def test_smallest_type(self):
+        arr = _as_uint(np.array([0., 1., 255.]))
+        self.assertEqual(arr.dtype, np.uint8)
+        self.assertEqual(arr.tolist(), [0, 1, 255])
+        self.assertEqual(_as_uint(np.array([0, 256])).dtype, np.uint16)
+
+    def test_non_finite_values(self):
+        arr = _as_uint(np.array([np.nan, 3., np.inf, -np.inf]))
+        self.assertEqual(arr.dtype, np.uint8)
+        self.assertEqual(arr.tolist(), [0, 3, 0, 0])
+
+    def test_empty(self):
+        self.assertEqual(_as_uint(np.zeros((0,))).size, 0)
+
+
+def make_map(maptype, regions={}, maploaders=[]):
+    """
+    Build a ParcellationMap around given regions and map loaders, without
+    fetching any configured maps.
+    """
+    pmap = ParcellationMap.__new__(ParcellationMap)
+    pmap.maptype = maptype
+    pmap.parcellation = MagicMock()
+    pmap.space = MagicMock()
+    pmap.resolution = None
+    pmap.regions = dict(regions)
+    pmap.maploaders = list(maploaders)
+    pmap._mapindices = {r: mapindex for (_, mapindex), r in regions.items()}
+    return pmap
+
+
+class TestParcellationMap(unittest.TestCase):
+
+    def test_decode_region_labelled_volume(self):
+        region = MagicMock()
+        pmap = make_map(
+            ParcellationMap.MapType.LABELLED_VOLUME,
+            regions={(5, 0): region})
+        self.assertIs(pmap.decode_region(5, 0), region)
+
+    def test_decode_region_regional_maps(self):
+        region = MagicMock()
+        pmap = make_map(
+            ParcellationMap.MapType.REGIONAL_MAPS,
+            regions={(-1, 3): region})
+        self.assertIs(pmap.decode_region(3), region)
+
+    def test_assign_regions_with_missing_map(self):
+        missing, found = MagicMock(), MagicMock()
+        arr = np.zeros((3, 3, 3), dtype='float32')
+        arr[1, 1, 1] = 0.5
+        img = nib.Nifti1Image(arr, np.eye(4))
+        pmap = make_map(
+            ParcellationMap.MapType.REGIONAL_MAPS,
+            regions={(-1, 0): missing, (-1, 1): found},
+            maploaders=[lambda quiet=False: None, lambda quiet=False: img])
+        assignments = pmap.assign_regions((1, 1, 1), print_report=False)
+        self.assertEqual(assignments, [[(found, 50.0)]])
+
+    def test_collect_keeps_regional_maps(self):
+        regions = [MagicMock(labelindex=labelindex) for labelindex in (3, 7)]
+        arrays = []
+        for i, region in enumerate(regions):
+            arr = np.zeros((2, 2, 2), dtype='uint8')
+            arr[i, 0, 0] = 1
+            arrays.append(arr)
+        maps = {
+            region: nib.Nifti1Image(arr.copy(), np.eye(4))
+            for region, arr in zip(regions, arrays)}
+        pmap = make_map(ParcellationMap.MapType.LABELLED_VOLUME)
+        pmap.parcellation.regiontree = regions
+        pmap._load_regional_map = lambda region, quiet=False: maps[region]
+
+        labelled = pmap._load_parcellation_map("collect", quiet=True)
+        expected = np.zeros((2, 2, 2), dtype='uint8')
+        expected[0, 0, 0] = 3
+        expected[1, 0, 0] = 7
+        np.testing.assert_array_equal(np.asanyarray(labelled.dataobj), expected)
+        # the cached regional maps are left untouched
+        for region, arr in zip(regions, arrays):
+            np.testing.assert_array_equal(np.asanyarray(maps[region].dataobj), arr)
+
+    def test_collect_converts_float_maps(self):
+        region = MagicMock(labelindex=4)
+        arr = np.zeros((2, 2, 2), dtype='float32')
+        arr[1, 1, 1] = 1
+        pmap = make_map(ParcellationMap.MapType.LABELLED_VOLUME)
+        pmap.parcellation.regiontree = [region]
+        pmap._load_regional_map = lambda r, quiet=False: nib.Nifti1Image(arr, np.eye(4))
+
+        labelled = pmap._load_parcellation_map("collect", quiet=True)
+        self.assertEqual(labelled.dataobj.dtype.kind, 'u')
+        self.assertEqual(np.asanyarray(labelled.dataobj)[1, 1, 1], 4)
+
+
+class TestDecodeRegion(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # duplicate label indices on several levels and in several maps
+        cls.parcellation = Parcellation('test/parcellation', 'Test Parcellation')
+        root = cls.parcellation.regiontree
+        cls.area_a = Region('area a', cls.parcellation, 1, mapindex=0, parent=root)
+        cls.area_a1 = Region('area a1', cls.parcellation, 1, mapindex=0, parent=cls.area_a)
+        cls.area_b = Region('area b', cls.parcellation, 2, mapindex=1, parent=root)
+        cls.area_b1 = Region('area b1', cls.parcellation, 1, mapindex=1, parent=cls.area_b)
+        cls.area_b2 = Region('area b2', cls.parcellation, 1, mapindex=2, parent=cls.area_b)
+        cls.area_c = Region('area c', cls.parcellation, 1, mapindex=1, parent=root)
+
+    def test_lookup_matches_tree_search(self):
+        specs = [1, 2, 3, self.area_b, self.area_b1, self.parcellation.regiontree]
+        for spec in specs:
+            for mapindex in [None, 0, 1, 2, 3]:
+                expected = self.parcellation.regiontree.find(
+                    spec, select_uppermost=True, mapindex=mapindex)
+                self.assertEqual(
+                    self.parcellation._lookup_regions(spec, mapindex), expected,
+                    msg="spec {}, mapindex {}".format(spec, mapindex))
+
+    def test_decode_uppermost(self):
+        self.assertIs(self.parcellation.decode_region(2), self.area_b)
+        self.assertIs(self.parcellation.decode_region(1, 1), self.area_c)
+        self.assertIs(self.parcellation.decode_region(1, 2), self.area_b2)
+        self.assertIs(self.parcellation.decode_region(self.area_b1), self.area_b1)
+
+    def test_decode_unknown(self):
+        with self.assertRaises(ValueError):
+            self.parcellation.decode_region(3)
+        with self.assertRaises(ValueError):
+            self.parcellation.decode_region(2, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
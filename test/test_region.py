@@ -120,6 +120,18 @@ class TestRegions(unittest.TestCase):
         self.parent_region.children = []
         self.assertFalse(self.parent_region.includes(self.child_region))
 
+    def test_names_follow_tree_changes(self):
+        self.parent_region.children = []
+        self.assertFalse(self.child_region.key in self.parent_region.names)
+        self.parent_region.children = [self.child_region]
+        self.assertTrue(self.child_region.key in self.parent_region.names)
+
+    def test_find_follows_tree_changes(self):
+        self.parent_region.children = []
+        self.assertEqual(len(self.parent_region.find(self.region_name)), 0)
+        self.parent_region.children = [self.child_region]
+        self.assertEqual(len(self.parent_region.find(self.region_name)), 1)
+
     def test_includes_region_self(self):
         self.assertTrue(self.parent_region.includes(self.parent_region))
 